@@ -1,8 +1,21 @@
+from __future__ import print_function
+import matplotlib
+if __name__ == '__main__':
+    # Files only, no display; must precede the pylab import
+    matplotlib.use('Agg')
 import matplotlib.pylab as plt
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 from mpl_toolkits.mplot3d import axes3d
 import numplot.core as npl
 import numpy as np
 
+# Settings applied while plotting. Figures have a fixed size and margins,
+# so savefig renders once; line style is shared by all plotters.
+plot_style = {'savefig.bbox'          : 'standard',
+              'lines.linewidth'       : 3,
+              'lines.markeredgecolor' : 'black'}
+
 # These are the "Colors 20" colors as RGB.    
 colors = [(31, 119, 180), (174, 199, 232), (255, 127, 14), (255, 187, 120),    
              (44, 160, 44), (152, 223, 138), (214, 39, 40), (255, 152, 150),    
@@ -11,27 +24,36 @@ colors = [(31, 119, 180), (174, 199, 232), (255, 127, 14), (255, 187, 120),
              (188, 189, 34), (219, 219, 141), (23, 190, 207), (158, 218, 229)]    
   
 # Scale the RGB values to the [0, 1] range, which is the format matplotlib accepts.    
-for i in range(len(colors)):    
-    r, g, b = colors[i]    
-    colors[i] = (r / 255., g / 255., b / 255.)
+colors = np.asarray(colors, dtype=np.float32)*(1.0/255.0)
     
 #def exact_solution(t):
 #    return 50 - 2*np.exp(-0.196*t)
 
 def exact_solution(t):
-    return -0.5*np.exp(-6.0*t) -2.0*t*np.exp(-6.0*t)
+    # -(0.5 + 2t)*exp(-6t), evaluated with a single exp pass
+    u = np.array(t, dtype=float)
+    u *= -6.0
+    np.exp(u, out=u)
+    v = np.multiply(t, -2.0)
+    v -= 0.5
+    u *= v
+    # u[()] unwraps 0-d results back to a scalar
+    return u[()]
 
 def get_error(sets, xkey, ykey, exact):
     error_data = {}
     keys = sets.keys()
     for key in keys:
         data = sets[key]
-        u = exact(data[xkey])
+        x = np.ascontiguousarray(data[xkey])
+        u = exact(x)
 
         # Create a data map for error
         error = {}
-        error[xkey] = data[xkey]
-        error['error'] = abs(u - data[ykey])
+        error[xkey] = x
+        # |u - y| in one buffer
+        err = np.subtract(u, data[ykey])
+        error['error'] = np.abs(err, out=err)
 
         # Add this data to map
         error_data[key] = error
@@ -49,36 +71,56 @@ def get_rmse(sets):
         rmse[key] = val
     return rmse
 
-def plot_solution(sets, xkey, ykey, name):
+# Figure shared by all plotters, created on first use
+_shared = {}
+
+def get_axes():
     '''
-    Plot x vs u for different data sets
-    '''    
-    # Plot
-    plt.figure()    
-    fig, ax = plt.subplots()
+    Return the shared figure and axes, cleared for a new plot
+    '''
+    if 'ax' not in _shared or not plt.fignum_exists(_shared['fig'].number):
+        _shared['fig'], _shared['ax'] = plt.subplots(figsize=(6.4, 4.8))
+        _shared['fig'].subplots_adjust(left=0.13, right=0.97,
+                                       bottom=0.11, top=0.97)
+    fig, ax = _shared['fig'], _shared['ax']
+    ax.cla()
     ax.spines['right'].set_visible(True)
     ax.spines['top'].set_visible(True)
     ax.xaxis.set_ticks_position('bottom')
-    ax.yaxis.set_ticks_position('left')   
-    #ax.annotate('192,000 dof', xy=(4, 500))
-    #ax.annotate('2 million dof', xy=(25, 10000))
-    #plt.axis([5, 45, -.1, 1.0])
-    #plt.xticks(np.arange(5, 50, step=5))
-        
-    # plot solutions on same graph
-    keys = sets.keys()
-    cidx = 0
-    for key in keys:
-        cidx += 2
-        data = sets[key]
-        plt.semilogy(data[xkey], data[ykey], '-' , lw=3, mec='black', label=key)
-        
-    # Axis formatting
-    plt.legend(loc='upper right')
-    plt.xlabel(xkey)
-    plt.ylabel(ykey)
+    ax.yaxis.set_ticks_position('left')
+    return fig, ax
 
-    plt.savefig(name, bbox_inches='tight', pad_inches=0.05)
+def plot_solution(sets, xkey, ykey, name):
+    '''
+    Plot x vs u for different data sets
+    '''    
+    # Plot
+    with plt.rc_context(plot_style):
+        fig, ax = get_axes()
+        #ax.annotate('192,000 dof', xy=(4, 500))
+        #ax.annotate('2 million dof', xy=(25, 10000))
+        #plt.axis([5, 45, -.1, 1.0])
+        #plt.xticks(np.arange(5, 50, step=5))
+
+        # plot solutions on same graph
+        keys = sets.keys()
+        cidx = 0
+        for key in keys:
+            cidx += 2
+            data = sets[key]
+            ax.semilogy(data[xkey], data[ykey], '-' , label=key)
+
+        # Axis formatting
+        ax.legend(loc='upper right')
+        ax.set_xlabel(xkey)
+        ax.set_ylabel(ykey)
+
+        # Time histories have one vertex per step, so embed them as a
+        # raster in the PDF; axes and labels stay vector
+        for line in ax.get_lines():
+            line.set_rasterized(True)
+
+        fig.savefig(name, dpi=150)
         
     return
 
@@ -86,30 +128,30 @@ def plot_refinement(sets, xkey, ykey, name):
     '''
     Plot computational time for jacobi, seidel and sor
     '''
-    plt.figure()
-    
-    fig, ax = plt.subplots()
-    ax.spines['right'].set_visible(True)
-    ax.spines['top'].set_visible(True)
-    ax.xaxis.set_ticks_position('bottom')
-    ax.yaxis.set_ticks_position('left')   
-    #plt.axis([100, 10000, 1.0e-5, 1.0e-1])
-
-    # plot solutions on same graph
-    keys = sets.keys()
-    cidx = 0
-    for key in keys:
-        cidx += 2
-        data = sets[key]
-        plt.loglog(data[xkey], data[ykey], '-' ,
-                   lw=3, mec='black',
-                   label=key)
-    # Axis formatting
-    plt.legend(loc='lower left')
-    plt.xlabel(xkey)
-    plt.ylabel(ykey)
-
-    plt.savefig(name, bbox_inches='tight', pad_inches=0.05)    
+    with plt.rc_context(plot_style):
+        fig, ax = get_axes()
+        #plt.axis([100, 10000, 1.0e-5, 1.0e-1])
+
+        # plot solutions on same graph as a single collection
+        ax.set_xscale('log')
+        ax.set_yscale('log')
+        keys = list(sets.keys())
+        lcolors = colors[(2*np.arange(len(keys))) % len(colors)]
+        segments = []
+        handles = []
+        for key, color in zip(keys, lcolors):
+            data = sets[key]
+            segments.append(np.column_stack([data[xkey], data[ykey]]))
+            handles.append(Line2D([], [], color=tuple(color), label=key))
+        ax.add_collection(LineCollection(segments, colors=lcolors))
+        ax.autoscale_view()
+
+        # Axis formatting
+        ax.legend(handles=handles, loc='lower left')
+        ax.set_xlabel(xkey)
+        ax.set_ylabel(ykey)
+
+        fig.savefig(name)
     return
 
 def find_rmse(files):    
@@ -131,74 +173,59 @@ def find_rmse(files):
     return rmse
 
 def invertmap(sets):
-    # plot solutions on same graph
-    keys = sets.keys()
-    for key in keys:
-        methods = sets[key].keys()
-    xvals = []
-    for key in keys:
-        xvals.append(int(key))
+    # transpose size -> method -> rmse into method -> spacing/error
+    # in a single pass over the data
     rmse = {}
-    for key in methods:
-        points = sets.keys()
-        data = {}
-        data['spacing'] = xvals
-        yvals = []
-        for point in points:
-            yvals.append(sets[point][key])
-        data['error'] = yvals
-        rmse[key] = data
+    for point in sets.keys():
+        for key, val in sets[point].items():
+            if key not in rmse:
+                rmse[key] = {'spacing' : [], 'error' : []}
+            rmse[key]['spacing'].append(int(point))
+            rmse[key]['error'].append(val)
     return rmse
 
+# Integrators and the orders run for each
+schemes = [('bdf', range(1, 7)), ('dirk', range(2, 5)), ('abm', range(1, 7))]
+
 def get_files(n):
     files = {}
-    files['bdf1']  = 'smd-bdf1-'  + n + '.dat'
-    files['bdf2']  = 'smd-bdf2-'  + n + '.dat'
-    files['bdf3']  = 'smd-bdf3-'  + n + '.dat'
-    files['bdf4']  = 'smd-bdf4-'  + n + '.dat'
-    files['bdf5']  = 'smd-bdf5-'  + n + '.dat'
-    files['bdf6']  = 'smd-bdf6-'  + n + '.dat'
-    
-    files['dirk2'] = 'smd-dirk2-' + n + '.dat'
-    files['dirk3'] = 'smd-dirk3-' + n + '.dat'
-    files['dirk4'] = 'smd-dirk4-' + n + '.dat'
-    
-    files['abm1']  = 'smd-abm1-'  + n + '.dat'
-    files['abm2']  = 'smd-abm2-'  + n + '.dat'
-    files['abm3']  = 'smd-abm3-'  + n + '.dat'
-    files['abm4']  = 'smd-abm4-'  + n + '.dat'
-    files['abm5']  = 'smd-abm5-'  + n + '.dat'
-    files['abm6']  = 'smd-abm6-'  + n + '.dat'
-    
+    for scheme, orders in schemes:
+        for order in orders:
+            method = scheme + str(order)
+            files[method] = 'smd-' + method + '-' + n + '.dat'
     return files
 
 def get_numerical_orders(data):
     """
     """
-    orders = {}
-    # unpack data based on size
-    methods = data.keys()
-    for method in methods:
-        spacings = data[method]['spacing']
-        rmse = data[method]['error']
-        p = np.log(rmse[0]/rmse[1])/np.log(1.0*spacings[0]/spacings[1])
-        orders[method] = p
+    # unpack the first two sizes of every method into (method, 2) arrays
+    methods = list(data.keys())
+    if not methods:
+        return {}
+    spacings = np.array([data[method]['spacing'][:2] for method in methods],
+                        dtype=np.float64)
+    rmse = np.array([data[method]['error'][:2] for method in methods])
+    
+    # observed order for all methods at once
+    p = np.log(rmse[:,0]/rmse[:,1])/np.log(spacings[:,0]/spacings[:,1])
+    orders = dict(zip(methods, p.tolist()))
     return orders
 
 #####################################################################
 # Plot solution
 #####################################################################
 
-sizes = ['1250', '2500', '5000', '10000']
+if __name__ == '__main__':
+    sizes = ['1250', '2500', '5000', '10000']
 
-RMSE = {}
-for size in sizes:
-    RMSE[size] = find_rmse(get_files(size))    
-#print RMSE
+    RMSE = {}
+    for size in sizes:
+        RMSE[size] = find_rmse(get_files(size))    
+    #print(RMSE)
 
-rmse = invertmap(RMSE)
-plot_refinement(rmse, 'spacing', 'error', 'convergence.pdf')
+    rmse = invertmap(RMSE)
+    plot_refinement(rmse, 'spacing', 'error', 'convergence.pdf')
 
-# Get order of convergence plots
-orders = get_numerical_orders(rmse)
-print orders
+    # Get order of convergence plots
+    orders = get_numerical_orders(rmse)
+    print(orders)